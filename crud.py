@@ -1,38 +1,63 @@
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from models import Message, Alert
 
 
+def bulk_create_messages(db: Session, rows: list[dict]) -> list[int]:
+    """
+    Insert a batch of messages with a single executemany statement.
+
+    Skips ORM instance tracking: one prepared INSERT and one commit
+    (one fsync) cover the whole batch.
+
+    Args:
+        db: Database session
+        rows: Column dicts for the messages table
+
+    Returns:
+        Generated ids of the inserted rows
+    """
+    result = db.execute(insert(Message).returning(Message.id), rows)
+    ids = [row.id for row in result]
+    db.commit()
+    return ids
+
+
 def create_message(db: Session, msg: Message) -> Message:
     """
     Persist a new message to the database.
-    
+
+    Flushes without committing so the caller can group several writes
+    into a single transaction.
+
     Args:
         db: Database session
         msg: Message object to save
-        
+
     Returns:
         Saved message with generated ID
     """
     db.add(msg)
-    db.commit()
-    db.refresh(msg)
+    db.flush()
     return msg
 
 
 def create_alert(db: Session, message: Message, keyword: str) -> Alert:
     """
     Create a security alert linked to a specific message.
-    
+
+    Flushes without committing so the caller can group several writes
+    into a single transaction.
+
     Args:
         db: Database session
         message: The message that triggered the alert
         keyword: The keyword that was detected
-        
+
     Returns:
         Created alert with generated ID
     """
     db_alert = Alert(message_id=message.id, keyword_found=keyword)
     db.add(db_alert)
-    db.commit()
-    db.refresh(db_alert)
+    db.flush()
     return db_alert
\ No newline at end of file
@@ -1,6 +1,6 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import scoped_session, sessionmaker
 import os
 
 
@@ -14,15 +14,92 @@ engine = create_engine(
     DATABASE_URL, connect_args={"check_same_thread": False}
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Tune SQLite for the append-heavy monitoring workload.
+
+    WAL with synchronous=NORMAL cuts commits from two fsyncs to roughly one
+    grouped fsync and lets readers run concurrently with the writer.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.executescript(
+        "PRAGMA journal_mode=WAL;"
+        "PRAGMA synchronous=NORMAL;"
+        "PRAGMA temp_store=MEMORY;"
+        "PRAGMA busy_timeout=5000;"
+        "PRAGMA cache_size=-20000;"
+    )
+    cursor.close()
+
+
+# expire_on_commit=False keeps attributes loaded after commit, so reading
+# e.g. msg.id post-commit does not trigger a SELECT-by-PK reload; server
+# defaults flow back through RETURNING on insert.
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
+)
+
+# The worker is a single process with one event loop, so one long-lived
+# session is reused across handler invocations instead of opening a fresh
+# SQLite connection (and re-applying pragmas) per message.
+Session = scoped_session(SessionLocal)
+
 Base = declarative_base()
 
 
 def init_db():
     """
     Initialize the database by creating all tables.
-    
+
     This function creates the database tables if they don't exist.
     Safe to call multiple times as it only creates missing tables.
     """
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
+    _migrate_db()
+
+
+def _migrate_db():
+    """
+    Bring a pre-existing database up to the current schema.
+
+    create_all only creates missing tables, never missing columns, and
+    deployments persist data/ across upgrades, so columns and indexes
+    added after the initial release are applied here when absent. Safe
+    to run repeatedly.
+    """
+    with engine.connect() as conn:
+        columns = {
+            row[1] for row in conn.exec_driver_sql("PRAGMA table_info(messages)")
+        }
+        if "content_hash" not in columns:
+            conn.exec_driver_sql(
+                "ALTER TABLE messages ADD COLUMN content_hash VARCHAR(32)"
+            )
+        conn.exec_driver_sql(
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_messages_content_hash "
+            "ON messages (content_hash)"
+        )
+        conn.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_messages_chat_ts "
+            "ON messages (chat_name, timestamp)"
+        )
+        conn.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_alerts_keyword_ts "
+            "ON alerts (keyword_found, timestamp)"
+        )
+        # Telegram message ids repeat across chats; the baseline's global
+        # UNIQUE index rejects legitimate messages as soon as more than
+        # one group is monitored. content_hash is the uniqueness key now.
+        indexes = {
+            row[1]: bool(row[2])
+            for row in conn.exec_driver_sql("PRAGMA index_list(messages)")
+        }
+        if indexes.get("ix_messages_telegram_message_id"):
+            conn.exec_driver_sql("DROP INDEX ix_messages_telegram_message_id")
+            conn.exec_driver_sql(
+                "CREATE INDEX ix_messages_telegram_message_id "
+                "ON messages (telegram_message_id)"
+            )
+        conn.commit()
\ No newline at end of file
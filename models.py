@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -12,9 +12,13 @@ class Message(Base):
     including text content, image metadata, and OCR results.
     """
     __tablename__ = "messages"
+    __table_args__ = (Index("ix_messages_chat_ts", "chat_name", "timestamp"),)
 
     id = Column(Integer, primary_key=True, index=True)
-    telegram_message_id = Column(Integer, unique=True, index=True)
+    # Telegram message ids are only unique per chat; cross-chat uniqueness
+    # is enforced by content_hash, which covers (chat_name, id).
+    telegram_message_id = Column(Integer, index=True)
+    content_hash = Column(String(32), unique=True, index=True)
     chat_name = Column(String(255), index=True)
     content = Column(Text, nullable=True)
     has_image = Column(Boolean, default=False)
@@ -32,6 +36,7 @@ class Alert(Base):
     that triggered the security notification.
     """
     __tablename__ = "alerts"
+    __table_args__ = (Index("ix_alerts_keyword_ts", "keyword_found", "timestamp"),)
 
     id = Column(Integer, primary_key=True, index=True)
     message_id = Column(Integer, ForeignKey("messages.id"))
@@ -1,22 +1,46 @@
 import asyncio
+import collections
+import concurrent.futures
 import io
 import logging
 import os
-from datetime import datetime
+import re
+import sys
+import time
 from pydantic_settings import BaseSettings
-from functools import lru_cache
+from functools import cached_property, lru_cache
+import ahocorasick
+import blake3
+import imagehash
 import pytesseract
 from PIL import Image
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+try:
+    import numba
+    import numpy as np
+except ImportError:
+    numba = None
 from colorama import Fore, Style, init
 
+from sqlalchemy.exc import IntegrityError
 from telethon import TelegramClient, events
+from telethon.tl.types import MessageEntityBold
 
-from database import SessionLocal, init_db
+from database import Session, SessionLocal, init_db
 from models import Message
-from crud import create_message, create_alert
+from crud import create_message, create_alert, bulk_create_messages
 
 init(autoreset=True)
 
+# Keep Tesseract single-threaded; its OpenMP threads thrash when several
+# images are processed concurrently.
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
 class Settings(BaseSettings):
     """
     Application configuration settings loaded from environment variables.
@@ -29,15 +53,16 @@ class Settings(BaseSettings):
     TELEGRAM_GROUPS: str
     BRAND_KEYWORDS: str
     ALERT_GROUP_ID: int
+    KEYWORD_MATCHER: str = "ahocorasick"
 
-    @property
+    @cached_property
     def MONITOR_GROUPS(self) -> list[str]:
-        """Parse comma-separated group names into a list."""
+        """Parse comma-separated group names into a list (computed once)."""
         return [g.strip() for g in self.TELEGRAM_GROUPS.split(',') if g.strip()]
 
-    @property
+    @cached_property
     def MONITOR_KEYWORDS(self) -> list[str]:
-        """Parse comma-separated keywords into a lowercase list."""
+        """Parse comma-separated keywords into a lowercase list (computed once)."""
         return [k.strip().lower() for k in self.BRAND_KEYWORDS.split(',') if k.strip()]
 
     class Config:
@@ -50,30 +75,179 @@ def get_settings():
 
 settings = get_settings()
 
+_AC = ahocorasick.Automaton()
+for _kw in settings.MONITOR_KEYWORDS:
+    _AC.add_word(_kw, _kw)
+_AC.make_automaton()
+
+_KW_RE = (
+    re.compile("|".join(re.escape(k) for k in settings.MONITOR_KEYWORDS))
+    if settings.MONITOR_KEYWORDS
+    else None
+)
+
+# Multi-page screenshots produce OCR transcripts long enough that the
+# scan itself becomes measurable; past this size a compiled byte-level
+# scan takes over from the automaton when numba is available.
+LONG_TEXT_THRESHOLD = 2048
+
+# If no byte 2-gram of the text overlaps any keyword 2-gram, no keyword
+# can match and the full matcher is skipped. The mask is computed by a
+# compiled byte loop; a Python-level pass would cost more than the
+# matcher it guards, so without numba the prefilter stays disabled
+# (mask 0). Only sound when every keyword contributes at least one
+# 2-gram, so a single-character keyword also disables it.
+_KW_2GRAM_MASK = 0
+
+if numba is not None:
+    _KW_LENGTHS = [len(k.encode()) for k in settings.MONITOR_KEYWORDS]
+    _KW_BUF = np.frombuffer(
+        "".join(settings.MONITOR_KEYWORDS).encode(), dtype=np.uint8
+    )
+    _KW_OFFSETS = np.cumsum([0] + _KW_LENGTHS).astype(np.int64)
+
+    @numba.njit(cache=True)
+    def _scan_long(text, kw_buf, kw_offsets):
+        """Return indices of keywords present in text (all uint8 arrays)."""
+        found = []
+        n = text.size
+        for i in range(kw_offsets.size - 1):
+            start = kw_offsets[i]
+            length = kw_offsets[i + 1] - start
+            for j in range(n - length + 1):
+                match = True
+                for k in range(length):
+                    if text[j + k] != kw_buf[start + k]:
+                        match = False
+                        break
+                if match:
+                    found.append(i)
+                    break
+        return found
+
+    @numba.njit(cache=True)
+    def _two_gram_mask_bytes(data):
+        """Fold the byte 2-grams of a uint8 array into a 64-bit bitmask."""
+        mask = np.uint64(0)
+        one = np.uint64(1)
+        for i in range(data.size - 1):
+            bucket = (
+                np.uint64(data[i]) * np.uint64(31) + np.uint64(data[i + 1])
+            ) & np.uint64(63)
+            mask |= one << bucket
+        return mask
+
+    if settings.MONITOR_KEYWORDS and all(len(k) >= 2 for k in settings.MONITOR_KEYWORDS):
+        for _kw in settings.MONITOR_KEYWORDS:
+            _KW_2GRAM_MASK |= int(
+                _two_gram_mask_bytes(np.frombuffer(_kw.encode(), dtype=np.uint8))
+            )
+
+_LOWER_ASCII = bytes.maketrans(bytes(range(65, 91)), bytes(range(97, 123)))
+
+def fast_lower(text: str) -> str:
+    """
+    Lowercase text with an ASCII fast path.
+
+    bytes.translate with a precomputed table is a single C pass and beats
+    str.lower() on pure-ASCII content; anything non-ASCII falls back to
+    str.lower().
+    """
+    try:
+        return text.encode("ascii").translate(_LOWER_ASCII).decode("ascii")
+    except UnicodeEncodeError:
+        return text.lower()
+
 logging.basicConfig(format='[%(levelname) 5s/%(asctime)s] %(name)s: %(message)s',
                     level=logging.INFO)
 log = logging.getLogger(__name__)
 
-def extract_text_from_image(image_bytes: bytes) -> str:
+OCR_MAX_DIMENSION = 1600
+
+# Memes and forwards recirculate constantly on Telegram; a small LRU of
+# perceptual hashes lets re-posted images reuse the previous OCR result
+# instead of running Tesseract again. Lives in the OCR pool workers, so
+# each worker keeps its own cache.
+_PHASH_CACHE: collections.OrderedDict = collections.OrderedDict()
+_PHASH_CACHE_MAX = 1024
+
+# In-process Tesseract API: loads the LSTM model once and keeps it warm,
+# instead of paying a fork/exec plus model reload for every image the way
+# the pytesseract subprocess does. Falls back to pytesseract when
+# tesserocr is not installed or cannot find its traineddata (the wheel
+# bundles none; TESSDATA_PREFIX must point at the installed tessdata).
+_TESS = None
+if tesserocr is not None:
+    try:
+        _TESS = tesserocr.PyTessBaseAPI(
+            lang='por', oem=tesserocr.OEM.LSTM_ONLY, psm=tesserocr.PSM.SINGLE_BLOCK
+        )
+    except RuntimeError as e:
+        log.warning(f"tesserocr unavailable ({e}), falling back to pytesseract.")
+
+def extract_text_from_image(image_buffer: io.BytesIO) -> str:
     """
     Extract text from image using OCR.
-    
+
+    The image is converted to grayscale and downscaled to at most
+    OCR_MAX_DIMENSION pixels on the long side before recognition, since
+    Tesseract's cost grows with pixel count.
+
     Args:
-        image_bytes: Raw image data
-        
+        image_buffer: Buffer holding the encoded image data
+
     Returns:
-        Extracted text in lowercase, empty string on error
+        Extracted text with its original casing, empty string on error
     """
     try:
-        image = Image.open(io.BytesIO(image_bytes))
-        text = pytesseract.image_to_string(image, lang='por')
+        image_buffer.seek(0)
+        image = Image.open(image_buffer)
+        image = image.convert("L")
+        if max(image.size) > OCR_MAX_DIMENSION:
+            image.thumbnail(
+                (OCR_MAX_DIMENSION, OCR_MAX_DIMENSION), Image.Resampling.LANCZOS
+            )
+
+        phash = str(imagehash.phash(image))
+        cached = _PHASH_CACHE.get(phash)
+        if cached is not None:
+            _PHASH_CACHE.move_to_end(phash)
+            log.info("Image matches a recently OCR'd image, reusing cached text.")
+            return cached
+
+        if _TESS is not None:
+            _TESS.SetImage(image)
+            text = _TESS.GetUTF8Text()
+        else:
+            text = pytesseract.image_to_string(image, lang='por', config='--oem 1 --psm 6')
         if text.strip():
             log.info(f"OCR extracted text: {text[:50].strip()}...")
-        return text.lower()
+
+        text = text.strip()
+        _PHASH_CACHE[phash] = text
+        if len(_PHASH_CACHE) > _PHASH_CACHE_MAX:
+            _PHASH_CACHE.popitem(last=False)
+        return text
     except Exception as e:
         log.error(f"Error during OCR: {e}")
         return ""
 
+def _init_ocr_worker():
+    """
+    Initialize an OCR pool worker.
+
+    Importing this module already builds the per-process Tesseract API,
+    so the initializer only has to pin OpenMP threading in the child.
+    """
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+# OCR is CPU-bound and would block the event loop for seconds per image,
+# stalling every other incoming message. A small process pool keeps the
+# Telethon loop responsive and lets images OCR in parallel across cores.
+_OCR_POOL = concurrent.futures.ProcessPoolExecutor(
+    max_workers=min(os.cpu_count() or 1, 4), initializer=_init_ocr_worker
+)
+
 SESSION_DIR = "session"
 SESSION_FILE = os.path.join(SESSION_DIR, "telethon.session")
 os.makedirs(SESSION_DIR, exist_ok=True)
@@ -83,19 +257,143 @@ client = TelegramClient(SESSION_FILE, settings.API_ID, settings.API_HASH)
 def check_for_keywords(text_to_check: str) -> list[str]:
     """
     Check if any monitored keywords are present in the given text.
-    
+
+    Uses an Aho-Corasick automaton built once at startup, so the scan is a
+    single linear pass over the text regardless of how many keywords are
+    configured. Set KEYWORD_MATCHER=regex to use a precompiled regex
+    alternation instead (useful for benchmarking the two backends).
+    Texts longer than LONG_TEXT_THRESHOLD are scanned with a
+    numba-compiled byte loop when numba is installed.
+
     Args:
         text_to_check: Text content to analyze
-        
+
     Returns:
         List of keywords found in the text
     """
-    found = []
-    for keyword in settings.MONITOR_KEYWORDS:
-        if keyword in text_to_check:
-            found.append(keyword)
-    
-    return found
+    if not settings.MONITOR_KEYWORDS:
+        return []
+    if numba is not None:
+        text_bytes = np.frombuffer(text_to_check.encode(), dtype=np.uint8)
+        if _KW_2GRAM_MASK and int(_two_gram_mask_bytes(text_bytes)) & _KW_2GRAM_MASK == 0:
+            return []
+        if len(text_to_check) > LONG_TEXT_THRESHOLD:
+            keywords = settings.MONITOR_KEYWORDS
+            return [keywords[i] for i in _scan_long(text_bytes, _KW_BUF, _KW_OFFSETS)]
+    if settings.KEYWORD_MATCHER == "regex":
+        if _KW_RE is None:
+            return []
+        return list(set(_KW_RE.findall(text_to_check)))
+    return list({keyword for _, keyword in _AC.iter(text_to_check)})
+
+_BANNER = Fore.RED + Style.BRIGHT + "=" * 41 + "\n"
+
+_ALERT_TIME_FMT = '%d/%m/%Y %H:%M:%S'
+
+def _utf16_len(text: str) -> int:
+    """Length of text in UTF-16 code units, the unit Telegram entities use."""
+    return len(text.encode('utf-16-le')) // 2
+
+def build_alert(chat_name: str, keyword_str: str, message_id: int,
+                preview_text: str, timestamp: str) -> tuple[str, list[MessageEntityBold]]:
+    """
+    Assemble the plain-text alert body and its bold formatting entities.
+
+    Entity offsets are tracked while the string is built, so the alert is
+    sent without any Markdown parsing.
+
+    Args:
+        chat_name: Name of the source chat
+        keyword_str: Comma-joined keywords that triggered the alert
+        message_id: ID of the message that triggered the alert
+        preview_text: Message content preview, empty to omit the line
+        timestamp: Formatted detection time
+
+    Returns:
+        Tuple of (message text, bold entities)
+    """
+    text = ""
+    entities = []
+
+    def bold(segment: str):
+        nonlocal text
+        entities.append(MessageEntityBold(_utf16_len(text), _utf16_len(segment)))
+        text += segment
+
+    bold("POSSIBLE LEAK OR EXPOSURE DETECTED")
+    text += "\n\n📍 "
+    bold("Group:")
+    text += f" {chat_name}\n🔍 "
+    bold("Keywords:")
+    text += f" {keyword_str}\n📝 "
+    bold("Message ID:")
+    text += f" {message_id}\n"
+    if preview_text:
+        text += "💬 "
+        bold("Content:")
+        text += f" {preview_text}\n"
+    text += "\n⏰ "
+    bold("Timestamp:")
+    text += f" {timestamp}"
+
+    return text, entities
+
+# Non-alerting messages are queued and drained in batches so sustained
+# bursts cost one executemany INSERT and one fsync per flush interval
+# instead of one transaction per message.
+BULK_FLUSH_INTERVAL = 0.05
+
+_MSG_QUEUE: asyncio.Queue = asyncio.Queue()
+
+def _flush_pending(db):
+    """
+    Insert everything currently queued; never raises.
+
+    On a constraint violation the batch is retried row by row, skipping
+    duplicates. Any other failure (e.g. a locked database) rolls back and
+    re-queues the rows so the next flush retries them; rows that did make
+    it in are skipped as duplicates on that retry.
+    """
+    rows = []
+    while not _MSG_QUEUE.empty():
+        rows.append(_MSG_QUEUE.get_nowait())
+    if not rows:
+        return
+
+    try:
+        try:
+            ids = bulk_create_messages(db, rows)
+            log.info(f"Flushed {len(ids)} message(s) to database.")
+        except IntegrityError:
+            db.rollback()
+            for row in rows:
+                try:
+                    bulk_create_messages(db, [row])
+                except IntegrityError:
+                    db.rollback()
+                    log.info(
+                        f"Message {row['telegram_message_id']} already stored, skipping."
+                    )
+    except Exception as e:
+        log.error(f"Error flushing message batch, will retry: {e}")
+        db.rollback()
+        for row in rows:
+            _MSG_QUEUE.put_nowait(row)
+
+async def flush_message_queue():
+    """
+    Drain queued message rows into batched inserts.
+
+    Runs as a background task with its own session so flushes never
+    interleave with the handler's transactions.
+    """
+    db = SessionLocal()
+    try:
+        while True:
+            await asyncio.sleep(BULK_FLUSH_INTERVAL)
+            _flush_pending(db)
+    finally:
+        db.close()
 
 async def send_telegram_alert(chat_name: str, found_keywords: list[str], message_id: int, message_text: str = None):
     """
@@ -108,26 +406,27 @@ async def send_telegram_alert(chat_name: str, found_keywords: list[str], message
         message_text: Optional message content preview
     """
     try:
-        keyword_str = ", ".join(found_keywords)
-        
-        alert_message = f"**POSSIBLE LEAK OR EXPOSURE DETECTED**\n\n"
-        alert_message += f"📍 **Group:** {chat_name}\n"
-        alert_message += f"🔍 **Keywords:** {keyword_str}\n"
-        alert_message += f"📝 **Message ID:** {message_id}\n"
-        
+        preview_text = ""
         if message_text and len(message_text) > 0:
             preview_text = message_text[:200] + "..." if len(message_text) > 200 else message_text
-            alert_message += f"💬 **Content:** {preview_text}\n"
-        
-        alert_message += f"\n⏰ **Timestamp:** {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}"
-        
-        result = await client.send_message(settings.ALERT_GROUP_ID, alert_message)
+
+        alert_message, entities = build_alert(
+            chat_name=chat_name,
+            keyword_str=", ".join(found_keywords),
+            message_id=message_id,
+            preview_text=preview_text,
+            timestamp=time.strftime(_ALERT_TIME_FMT)
+        )
+
+        result = await client.send_message(
+            settings.ALERT_GROUP_ID, alert_message,
+            parse_mode=None, formatting_entities=entities
+        )
         log.info(f"Alert sent successfully to group ID {settings.ALERT_GROUP_ID} (Msg ID: {result.id})")
         
     except Exception as e:
         log.error(f"Error sending alert to Telegram: {e}")
 
-@client.on(events.NewMessage(chats=settings.MONITOR_GROUPS))
 async def handle_new_message(event):
     """
     Process incoming messages from monitored Telegram groups.
@@ -141,57 +440,84 @@ async def handle_new_message(event):
     
     log.info(f"New message from '{chat_name}'")
     
-    db = SessionLocal()
-    
+    db = Session()
+
+    content_hash = blake3.blake3(
+        f"{chat_name}:{message.id}".encode()
+    ).hexdigest()[:32]
+
     try:
-        text_to_check = ""
+        # Telegram re-delivers messages on reconnect; skip duplicates
+        # before paying for media download and OCR.
+        with db.begin():
+            duplicate = (
+                db.query(Message.id).filter_by(content_hash=content_hash).first()
+            )
+        if duplicate is not None:
+            log.info(f"Message {message.id} already processed, skipping.")
+            return
+
         ocr_text = ""
-        
-        if message.text:
-            text_to_check += message.text.lower()
 
         if message.photo:
             log.info("Downloading image for OCR analysis...")
-            image_bytes = await message.download_media(file=bytes)
-            ocr_text = extract_text_from_image(image_bytes)
-            text_to_check += " " + ocr_text
+            image_buffer = io.BytesIO()
+            await message.download_media(file=image_buffer)
+            ocr_text = await asyncio.get_running_loop().run_in_executor(
+                _OCR_POOL, extract_text_from_image, image_buffer
+            )
+
+        # Lowercase once for matching; the database keeps original casing.
+        text_to_check = fast_lower((message.text or "") + " " + ocr_text)
 
-        db_message = Message(
+        row = dict(
             telegram_message_id=message.id,
             chat_name=chat_name,
             content=message.text,
             has_image=(message.photo is not None),
-            ocr_text=ocr_text.strip() if ocr_text else None
+            ocr_text=ocr_text if ocr_text else None,
+            content_hash=content_hash
         )
-        saved_msg = create_message(db, db_message)
-        log.info(f"Message {saved_msg.id} saved to database.")
 
         found_keywords = check_for_keywords(text_to_check)
-        
-        if found_keywords:
+
+        if not found_keywords:
+            # No immediate id needed: let the background task batch it.
+            _MSG_QUEUE.put_nowait(row)
+            return
+
+        with db.begin():
+            saved_msg = create_message(db, Message(**row))
+            log.info(f"Message {saved_msg.id} saved to database.")
+
             keyword_str = ", ".join(found_keywords)
-            
-            print(Fore.RED + Style.BRIGHT + "=========================================")
-            print(Fore.RED + Style.BRIGHT + f"!!! POSSIBLE LEAK OR EXPOSURE DETECTED !!!")
-            print(Fore.YELLOW + f"Group:    {chat_name} (Msg ID: {saved_msg.id})")
-            print(Fore.YELLOW + f"Keywords: {keyword_str}")
-            print(Fore.RED + Style.BRIGHT + "=========================================" + Style.RESET_ALL)
-            
+
+            # One pre-formatted write instead of five print() calls: a
+            # single stdio lock acquisition and flush per alert.
+            sys.stderr.write(
+                f"{_BANNER}"
+                f"!!! POSSIBLE LEAK OR EXPOSURE DETECTED !!!\n"
+                f"{Fore.YELLOW}Group:    {chat_name} (Msg ID: {saved_msg.id})\n"
+                f"{Fore.YELLOW}Keywords: {keyword_str}\n"
+                f"{_BANNER}{Style.RESET_ALL}"
+            )
+
             create_alert(db, message=saved_msg, keyword=keyword_str)
             log.warning(f"Alert saved to database for message {saved_msg.id}.")
-            
-            await send_telegram_alert(
-                chat_name=chat_name,
-                found_keywords=found_keywords,
-                message_id=saved_msg.id,
-                message_text=message.text
-            )
 
+        await send_telegram_alert(
+            chat_name=chat_name,
+            found_keywords=found_keywords,
+            message_id=saved_msg.id,
+            message_text=message.text
+        )
+
+    except IntegrityError:
+        log.info(f"Message {message.id} already processed, skipping.")
+        Session.rollback()
     except Exception as e:
         log.error(f"Error processing message {message.id}: {e}")
-        db.rollback()
-    finally:
-        db.close()
+        Session.rollback()
 
 async def main():
     """
@@ -210,6 +536,11 @@ async def main():
     log.info("Starting Telethon client...")
     await client.start(phone=settings.PHONE_NUMBER)
     log.info(f"Client started! Monitoring {len(settings.MONITOR_GROUPS)} group(s).")
+
+    # Resolve group names to input entities once, so Telethon's per-event
+    # chat filter is an integer comparison instead of a name lookup.
+    entities = [await client.get_input_entity(name) for name in settings.MONITOR_GROUPS]
+    client.add_event_handler(handle_new_message, events.NewMessage(chats=entities))
     
     log.info("=== AVAILABLE DIALOGS ===")
     async for dialog in client.iter_dialogs():
@@ -217,13 +548,28 @@ async def main():
             log.info(f"  - {dialog.name} (ID: {dialog.id}) - Type: {'Channel' if dialog.is_channel else 'Group'}")
     log.info("=== END OF LIST ===")
     
+    flusher = asyncio.create_task(flush_message_queue())
+
     log.info("Waiting for new messages... (Press Ctrl+C to stop)")
-    
-    await client.run_until_disconnected()
+
+    try:
+        await client.run_until_disconnected()
+    finally:
+        flusher.cancel()
+        # Persist whatever is still queued before the process exits; the
+        # flusher only yields at its sleep, so no flush is mid-flight here.
+        db = SessionLocal()
+        try:
+            _flush_pending(db)
+        finally:
+            db.close()
 
 
 if __name__ == "__main__":
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
-        log.info("Shutting down...")
\ No newline at end of file
+        log.info("Shutting down...")
+    finally:
+        _OCR_POOL.shutdown()
+        Session.remove()
\ No newline at end of file